@@ -19,11 +19,19 @@ import logging
 import re
 
 
+# lookup and pattern used by XMLLoader.str_to_bool and XMLLoader.str_to_int
+_BOOL_STRS = {"true": True, "false": False}
+_LEADING_INT = re.compile(r"-?\d+")
+
+
 class XMLLoader(ABC):
     """
     Class for all classes that load from an xml
     TODO : tag classes that can be wrapped into this
     """
+    # subclasses that don't declare __slots__ still get an instance __dict__
+    __slots__ = ("logger",)
+
     def __init__(self, node: ET.Element = None):
         """
         Args:
@@ -58,11 +66,9 @@ class XMLLoader(ABC):
         Throws:
             ValueError if the string cannot be converted due to a typo or other error
         """
-        conv = {"true": True,
-                "false": False}
         try:
-            return conv[boolstr.lower()]
-        except KeyError:
+            return _BOOL_STRS[boolstr.strip().lower()]
+        except (KeyError, AttributeError):
             raise ValueError(f"Expected a string 'true' or 'false' but received {boolstr}")
 
     @staticmethod
@@ -85,10 +91,10 @@ class XMLLoader(ABC):
         Throws:
             ValueError: If no leading integer was found
         """
-        try:
-            return int(re.findall("^-?\d+", num_str)[0])
-        except IndexError:
+        match = _LEADING_INT.match(num_str)
+        if match is None:
             raise ValueError(f"num_str = {num_str} is non-numeric!")
+        return int(match.group())
 
     def set_by_dict(self, attr: str, node_text: str, values: {str: str}):
         """
@@ -109,8 +115,6 @@ class XMLLoader(ABC):
                 is "Default", whose value is the key for the default value
                 in the dictionary. Note that the keys should be lowercase.
         """
-        # check that the dict keys are lowercase
-        assert set([v.lower() for v in values.keys()]) == set(values.keys())
         try:
             default = values["default"]
         except KeyError as e:
@@ -123,6 +127,9 @@ class XMLLoader(ABC):
         try:
             setattr(self, attr, values[node_text.lower()])
         except KeyError as er:
+            # a dict with mixed case keys can only show up as a failed lookup, so only check the
+            # keys are lowercase here rather than on every call
+            assert all(k == k.lower() for k in values)
             self.logger.warning(
                 f"{er}\n {attr} value {node_text} should be in {values.keys()}"
                 f"\nKeeping default {default} value {values[default]}"
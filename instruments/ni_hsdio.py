@@ -1,4 +1,5 @@
 from ctypes import *
+import numpy as np
 import os
 import struct
 import platform # for checking the os bitness
@@ -639,8 +640,10 @@ class HSDIOSession:
         """
 
         # self.logger.debug(f"Python Waveform data is {data}\nlength = {len(data)}")
-        c_data = (c_uint8 * len(data))(*data)
-        # self.logger.debug(f"C Waveform data is {list(c_data)}\n length = {len(list(c_data))}")
+        # hand the driver a pointer to the array's buffer, rather than copying it element by
+        # element into a ctypes array
+        data = np.ascontiguousarray(data, dtype=np.uint8)
+        c_data = data.ctypes.data_as(POINTER(c_uint8))
         # self.logger.debug(f"Pyhon samples per channel = {samples_per_chan}\n C samples per chan {c_int32(samples_per_chan)}")
         c_wvfm_name = c_char_p(waveform_name.encode('utf-8'))
         error_code = self.hsdio.niHSDIO_WriteNamedWaveformWDT(
@@ -712,12 +715,14 @@ class HSDIOSession:
         """
 
         c_wvfm_name = c_char_p(waveform_name.encode('utf-8'))
+        data = np.ascontiguousarray(data, dtype=np.uint32)
+        c_data = data.ctypes.data_as(POINTER(c_uint32))
 
         error_code = self.hsdio.niHSDIO_WriteNamedWaveformU32(
             self.vi,                    # ViSession
             c_wvfm_name,                # ViConstString
             c_int32(samples_to_write),  # ViInt32
-            data,                       # ViUInt32[]
+            c_data,                     # ViUInt32[]
         )
 
         if error_code != 0 and check_error:
@@ -12,9 +12,10 @@ import logging
 import colorlog
 import threading
 import xml.etree.ElementTree as ET
+from io import BytesIO
 from typing import Tuple
-from queue import Queue, Empty
-from time import time, sleep
+from collections import deque
+from time import time
 from typing import List
 
 ## misc local classes
@@ -47,6 +48,14 @@ class PXI:
                 " - 'x' to print the most recently received xml to a file \n" +
                 " - 'q' to stop the connection and close this server.")
 
+    # set True to keep the tags of the most recently parsed message in
+    # self.element_tags, for debugging
+    record_element_tags = False
+
+    # max number of queued commands handled on each pass of command_loop,
+    # before it checks again for stop_connections and exit_measurement
+    command_batch_size = 16
+
     def __init__(self, address: Tuple[str, int]):
         self.root_logger = logging.getLogger() # root_logger
         self._root_logging_lvl_default = self.root_logger.level
@@ -61,13 +70,21 @@ class PXI:
         self._stop_connections = False
         self._reset_connection = False
         self._exit_measurement = False
+        # set whenever stop_connections or exit_measurement is True, so that
+        # waits in the measurement loop return as soon as they are requested
+        self._abort_event = threading.Event()
         self.cycle_continuously = False
         self.return_data = b""
         self.return_data_queue = b""
         self.measurement_timeout = 0
         self.keylisten_thread = None
-        self.command_queue = Queue(0)  # 0 indicates no maximum queue length enforced.
-        self.element_tags = []  # for debugging
+        # the network thread appends and the experiment thread pops. deque's
+        # append/popleft are atomic, but reset_exp_thread can start a second
+        # command_loop while the first is still running, so a pop can find the
+        # queue emptied by the other consumer (see command_loop)
+        self.command_queue = deque()
+        self._command_event = threading.Event()  # set when a command is queued
+        self.element_tags = []  # for debugging. see record_element_tags
         self.devices = []
 
         # instantiate the device objects
@@ -80,6 +97,24 @@ class PXI:
         self.hamamatsu = Hamamatsu(self)
         self.counters = Counters(self)
 
+        # the child tags of <LabView> which parse_xml knows how to handle,
+        # and the method called for each
+        self._tag_handlers = {
+            "measure": self._handle_measure,
+            "pause": self._handle_unimplemented,
+            "run": self._handle_unimplemented,
+            "HSDIO": self._handle_hsdio,
+            "TTL": self._handle_ttl,
+            "DAQmxDO": self._handle_unimplemented,
+            "timeout": self._handle_timeout,
+            "cycleContinuously": self._handle_cycle_continuously,
+            "camera": self._handle_camera,
+            "AnalogOutput": self._handle_analog_output,
+            "AnalogInput": self._handle_analog_input,
+            "Counters": self._handle_counters,
+            "RF_generators": self._handle_unimplemented
+        }
+
     @property
     def stop_connections(self) -> bool:
         return self._stop_connections
@@ -87,6 +122,9 @@ class PXI:
     @stop_connections.setter
     def stop_connections(self, value):
         self._stop_connections = value
+        self._update_abort_event()
+        if value:
+            self.tcp.wake()
 
     @property
     def reset_connection(self) -> bool:
@@ -95,6 +133,8 @@ class PXI:
     @reset_connection.setter
     def reset_connection(self, value):
         self._reset_connection = value
+        if value:
+            self.tcp.wake()
 
     @property
     def exit_measurement(self) -> bool:
@@ -103,6 +143,13 @@ class PXI:
     @exit_measurement.setter
     def exit_measurement(self, value):
         self._exit_measurement = value
+        self._update_abort_event()
+
+    def _update_abort_event(self):
+        if self._stop_connections or self._exit_measurement:
+            self._abort_event.set()
+        else:
+            self._abort_event.clear()
 
     @property
     def active_devices(self):
@@ -126,7 +173,8 @@ class PXI:
         return self._sh_lvl_default
 
     def queue_command(self, command):
-        self.command_queue.put(command)
+        self.command_queue.append(command)
+        self._command_event.set()
 
     def launch_network_thread(self):
         self.tcp.launch_network_thread()
@@ -148,32 +196,51 @@ class PXI:
         """
         Update devices with xml from CsPy, and get and return data from devices
 
-        Pop a command from self.command_queue on each iteration, parse the xml
-        in that command, and update the instruments accordingly. When the queue
-        is empty, try to receive measurements from the data if cycling
-        continuously.
+        Pop the waiting commands from self.command_queue on each iteration (up
+        to self.command_batch_size), parse the xml in each command, update the
+        instruments accordingly, and send each reply to CsPy as soon as its
+        command is done. When the queue is empty, try to receive measurements
+        from the data if cycling continuously.
 
         This function handles the switching between updating devices and
         getting data from them, while the bulk of the work is done in the
         hierarchy of methods in self.parse_xml and self.measurement.
         """
 
+        command_queue = self.command_queue
+        command_event = self._command_event
+        batch_size = self.command_batch_size
         while not (self.stop_connections or self.exit_measurement):
-            try:
-                # dequeue xml
-                xml_str = self.command_queue.get(block=False, timeout=0)
-                self.parse_xml(xml_str)
-
-            except Empty:
+            # when idle, sleep until a command is queued (waking
+            # periodically to check for a stop). when cycling continuously,
+            # only take the commands which are already waiting.
+            cycling = self.cycle_continuously and self.active_devices > 0
+
+            # dequeue the waiting xml
+            if not (cycling or command_queue):
+                command_event.wait(0.01)
+            command_event.clear()
+            handled = 0
+            while handled < batch_size:
+                try:
+                    xml_str = command_queue.popleft()
+                except IndexError:
+                    # empty, possibly emptied by another command_loop
+                    break
+                # reply before taking the next command, so a slow command
+                # (e.g. a measurement) doesn't hold back earlier replies, and a
+                # failed send can't lose the replies to other commands
+                self.tcp.send_message(self.parse_xml(xml_str))
+                handled += 1
+
+            if not handled:
                 self.exit_measurement = False
                 self.return_data = b""  # clear the return data
 
-                if self.cycle_continuously and self.active_devices > 0:
+                if cycling:
                     self.logger.debug("Entering cycle continously...")
                     # This method returns the data
                     self.return_data_queue = self.measurement()
-            
-            sleep(0.001) # keep while loop from hogging resources
         
         self.shutdown()
         self.logger.info("Exiting Experiment Thread.")
@@ -188,7 +255,7 @@ class PXI:
         self.logger.info("starting keylistener")
         self.keylisten_thread.start()
 
-    def parse_xml(self, xml_str: str):
+    def parse_xml(self, xml_str: bytes) -> bytes:
         """
         Initialize the device instances and other settings from queued xml
         
@@ -198,132 +265,157 @@ class PXI:
         message from CsPy is received. 
         
         Args:
-            'xml_str': (str) xml received from CsPy in the receive_message method
+            'xml_str': (bytes) xml received from CsPy in the receive_message method
+        Returns:
+            the reply to be sent back to CsPy for this message
         """
 
         self.exit_measurement = False
         self.element_tags = []  # clear the list of received tags
 
-        # get the xml root
-        root = ET.fromstring(xml_str)
-        if root.tag != "LabView":
-            self.logger.warning("Not a valid msg for the pxi")
-
-        else:
-            # loop non-recursively over children in root to setup device
-            # hardware and other server settings
-            for child in root:
+        record_tags = self.record_element_tags
+        get_handler = self._tag_handlers.get
+        invalid_tags = []
+        pending = []
+        depth = 0
 
-                self.element_tags.append(child)
+        # stream the xml, collecting the handler for each child of the root.
+        # nothing is applied to the hardware until the whole message has
+        # parsed, so a truncated or malformed message changes nothing
+        try:
+            for event, node in ET.iterparse(BytesIO(xml_str), events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 1 and node.tag != "LabView":
+                        self.logger.warning("Not a valid msg for the pxi")
+                        break
+                    continue
+
+                depth -= 1
+                if depth != 1:
+                    # inside a child of the root, or the end of the root
+                    continue
+
+                # loop non-recursively over children in root to setup device
+                # hardware and other server settings
+                tag = node.tag
+
+                # keep only the tag, so the parsed subtree can be freed
+                if record_tags:
+                    self.element_tags.append(tag)
+
+                handler = get_handler(tag)
+                if handler is None:
+                    invalid_tags.append(tag)
+                    node.clear()
+                    continue
+
+                pending.append((handler, node))
+
+        except ET.ParseError as e:
+            self.logger.warning("Could not parse the msg for the pxi: %s", e)
+            pending = []
+
+        for handler, node in pending:
+            try:
+                handler(node)
+
+            # I do not catch AssertionErrors. The one at the top of load_xml in every 
+            # device class can only occur if the device is passed the wrong xml node, 
+            # which can never occur in pxi.parse_xml, as we check the tag before 
+            # instantiating a device. those assertions are there in case someone down the 
+            # road does something more careless. 
+            except (XMLError, HardwareError) as e:
+                self.handle_errors(e)
 
-                try:
+            # this child has been handled, so free its subtree
+            node.clear()
 
-                    if child.tag == "measure":
-                        # if no data available, take one measurement. Otherwise,
-                        # use the most recent data.
-                        if self.return_data_queue == b"":
-                            self.measurement()
-                        else:
-                            self.return_data = self.return_data_queue
-                            pass
-
-                    elif child.tag == "pause":
-                        # TODO: set state of server to 'pause';
-                        # i don't know if this a feature that currently gets used,
-                        # so might be able to omit this.
-                        pass
-
-                    elif child.tag == "run":
-                        # TODO: set state of server to 'run';
-                        # i don't know if this a feature that currently gets used,
-                        # so might be able to omit this.
-                        pass
-
-                    elif child.tag == "HSDIO":
-                        # setup the HSDIO
-                        self.hsdio.load_xml(child)
-                        self.logger.info("HSDIO XML loaded")
-                        self.hsdio.init()
-                        self.logger.info("HSDIO hardware initialized")
-                        self.hsdio.update()
-                        self.logger.info("HSDIO hardware updated")
-
-                    elif child.tag == "TTL":
-                        self.ttl.load_xml(child)
-                        self.logger.info("TTLInput XML loaded")
-                        self.ttl.init()
-                        self.logger.info("TTLInput hardware initialized")
-
-                    elif child.tag == "DAQmxDO":
-                        # self.daqmx_do.load_xml(child)
-                        # self.daqmx_do.init()
-                        pass
-
-                    elif child.tag == "timeout":
-                        try:
-                            # get timeout in [ms]
-                            self.measurement_timeout = 1000 * float(child.text)
-                        except ValueError as e:
-                            msg = f"{e} \n {child.text} is not valid" + \
-                                  f"text for node {child.tag}"
-                            raise XMLError(self, child, message=msg)
-
-                    elif child.tag == "cycleContinuously":
-                        cycle = False
-                        if child.text.lower() == "true":
-                            cycle = True
-                        self.cycle_continuously = cycle
-
-                    elif child.tag == "camera":
-                        # set up the Hamamatsu camera
-                        self.hamamatsu.load_xml(child)  # Raises ValueError
-                        self.hamamatsu.init()  # Raises IMAQErrors
-
-                    elif child.tag == "AnalogOutput":
-                        # set up the analog_output
-                        self.analog_output.load_xml(child)
-                        self.logger.info("AnalogOutput XML loaded")
-                        self.analog_output.init()
-                        self.logger.info("AnalogOutput initialized")
-                        self.analog_output.update()
-                        self.logger.info("AnalogOutput hardware updated")
-                    
-                    elif child.tag == "AnalogInput":
-                        # set up the analog_input
-                        self.analog_input.load_xml(child)
-                        self.analog_input.init()
-                    
-                    elif child.tag == "Counters":
-                    #     # TODO: implement counters class
-                    #     # set up the counters
-                        self.counters.load_xml(child)
-                        self.counters.init()
-                        pass
-
-                    # # might implement, or might move RF generator functionality to
-                    # # CsPy based on code used by Hybrid.
-                    elif child.tag == "RF_generators":
-                        pass
-
-                    else:
-                        self.logger.warning(f"Node {child.tag} received is not a valid" +
-                                            f"child tag under root <{root.tag}>")
-
-                # I do not catch AssertionErrors. The one at the top of load_xml in every 
-                # device class can only occur if the device is passed the wrong xml node, 
-                # which can never occur in pxi.parse_xml, as we check the tag before 
-                # instantiating a device. those assertions are there in case someone down the 
-                # road does something more careless. 
-                except (XMLError, HardwareError) as e:
-                    self.handle_errors(e)
+        # report the unknown tags once, rather than once per node
+        if invalid_tags:
+            self.logger.warning("Nodes %s received are not valid child tags "
+                                "under root <LabView>", invalid_tags)
 
-        # send a message back to CsPy
-        self.tcp.send_message(self.return_data)
+        # the reply to CsPy is sent by the command loop
+        return_data = self.return_data
 
         # clear the return data
         self.return_data = b""
         self.return_data_queue = b""
 
+        return return_data
+
+    # handlers for the child tags of <LabView>. each takes the child node.
+
+    def _handle_measure(self, node: ET.Element):
+        # if no data available, take one measurement. Otherwise,
+        # use the most recent data.
+        if self.return_data_queue == b"":
+            self.measurement()
+        else:
+            self.return_data = self.return_data_queue
+
+    def _handle_unimplemented(self, node: ET.Element):
+        # pause, run: TODO: set state of server to 'pause'/'run';
+        # i don't know if this a feature that currently gets used,
+        # so might be able to omit this.
+        # DAQmxDO: self.daqmx_do.load_xml(node); self.daqmx_do.init()
+        # RF_generators: might implement, or might move RF generator
+        # functionality to CsPy based on code used by Hybrid.
+        pass
+
+    def _handle_hsdio(self, node: ET.Element):
+        # setup the HSDIO
+        self.hsdio.load_xml(node)
+        self.logger.info("HSDIO XML loaded")
+        self.hsdio.init()
+        self.logger.info("HSDIO hardware initialized")
+        self.hsdio.update()
+        self.logger.info("HSDIO hardware updated")
+
+    def _handle_ttl(self, node: ET.Element):
+        self.ttl.load_xml(node)
+        self.logger.info("TTLInput XML loaded")
+        self.ttl.init()
+        self.logger.info("TTLInput hardware initialized")
+
+    def _handle_timeout(self, node: ET.Element):
+        try:
+            # get timeout in [ms]
+            self.measurement_timeout = 1000 * float(node.text)
+        except (TypeError, ValueError) as e:
+            msg = f"{e} \n {node.text} is not valid" + \
+                  f"text for node {node.tag}"
+            raise XMLError(self, node, message=msg)
+
+    def _handle_cycle_continuously(self, node: ET.Element):
+        text = node.text
+        self.cycle_continuously = text is not None and text.strip().lower() == "true"
+
+    def _handle_camera(self, node: ET.Element):
+        # set up the Hamamatsu camera
+        self.hamamatsu.load_xml(node)  # Raises ValueError
+        self.hamamatsu.init()  # Raises IMAQErrors
+
+    def _handle_analog_output(self, node: ET.Element):
+        # set up the analog_output
+        self.analog_output.load_xml(node)
+        self.logger.info("AnalogOutput XML loaded")
+        self.analog_output.init()
+        self.logger.info("AnalogOutput initialized")
+        self.analog_output.update()
+        self.logger.info("AnalogOutput hardware updated")
+
+    def _handle_analog_input(self, node: ET.Element):
+        # set up the analog_input
+        self.analog_input.load_xml(node)
+        self.analog_input.init()
+
+    def _handle_counters(self, node: ET.Element):
+        # set up the counters
+        self.counters.load_xml(node)
+        self.counters.init()
+
     def data_to_xml(self) -> str:
         """
         Get xml-formatted data string from device measurements
@@ -335,7 +427,7 @@ class PXI:
             'return_data': concatenated string of xml-formatted data
         """
 
-        return_data = b""
+        data_parts = []
 
         # the devices which have a method named 'data_out' which returns a str
         devices = [
@@ -351,10 +443,12 @@ class PXI:
         for dev in devices:
             if dev.is_initialized:
                 try:
-                    return_data += dev.data_out()
+                    data_parts.append(dev.data_out())
                 except HardwareError as e:
                     self.handle_errors(e)
 
+        # join once rather than re-copying the growing bytes on every device
+        return_data = b"".join(data_parts)
         self.return_data = return_data
         return return_data
 
@@ -380,11 +474,14 @@ class PXI:
             _is_error = False
 
             ## timed loop to frequently check if tasks are done
-            tau = 10  # loop period in [ms]
-            scl = 1e-6  # scale factor to convert ns to ms
-            
-            devtime = time()
-            finished_devs = []
+            tau = 0.001  # loop period in [s]
+
+            # stop waiting on the devices once the timeout set by CsPy (in
+            # [ms]) has elapsed. a timeout of 0 waits indefinitely.
+            deadline = None
+            if self.measurement_timeout > 0:
+                deadline = self.trelative + self.measurement_timeout/1000
+
             while not (_is_done or _is_error or self.stop_connections
                        or self.exit_measurement):
                 try:
@@ -393,8 +490,18 @@ class PXI:
                 except HardwareError as e:
                     self.handle_errors(e)
 
-                # sleep to reduce resource usage
-                sleep(0.001)
+                if _is_done:
+                    break
+
+                if deadline is not None and time() > deadline:
+                    self.logger.warning("Measurement timed out after %s ms. "
+                                        "No data returned.", self.measurement_timeout)
+                    self.stop_tasks()
+                    return b""
+
+                # yield to the other threads until the next check, returning
+                # early if the measurement is aborted in the meantime
+                self._abort_event.wait(tau)
 
             try:
                 self.get_data()
@@ -569,9 +676,9 @@ class PXI:
         if key == 'x': # print most recently received xml to file
             try:
                 fname = self.tcp.xml_to_file()
-                self.logger.info("wrote xml to file "+fname)
+                self.logger.info("wrote xml to file %s", fname)
             except Exception as e:
-                self.logger.error(f"oops. failed to write to file. + \n {e}")
+                self.logger.error("oops. failed to write to file. \n %s", e)
             
         if key == 'd': # toggle debug/info level root logging
             if self.root_logger.level != logging.DEBUG:
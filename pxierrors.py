@@ -17,16 +17,17 @@ class PXIError(Exception):
     Base class for categorizing device class-level exceptions
     """
 
-    def __init__(self, message: str, device: XMLLoader = None, error_code: int = 0):
+    def __init__(self, message: str = None, device: XMLLoader = None, error_code: int = 0):
         """
         Constructor for XMLError. 
         
         Args:
-            message: error message
+            message: error message. if None, it is built by default_message()
+                the first time it is needed
             device: a instance of an object which inherits from XMLLoader
         """
         self._message = message
-        super().__init__(self.message)
+        super().__init__()
         self._device = device
         self._error_code = error_code
         
@@ -42,8 +43,19 @@ class PXIError(Exception):
         """
         Return additional info about the error that occurred
         """
+        if self._message is None:
+            self._message = self.default_message()
         return self._message
 
+    def default_message(self) -> str:
+        """
+        Message used when none was given to the constructor
+        """
+        return ""
+
+    def __str__(self):
+        return self.message
+
     @property
     def error_code(self) -> int:
         """
@@ -77,11 +89,11 @@ class XMLError(PXIError):
             message: error message. if None (default), initialized internally
         """
         self._node = node
-        if message is None:
-            message = f"{device} encountered error at XML node {self.node.tag}"+\
-                f"\n with text \'{self.node.text}\'"
-
         super().__init__(message, device)
+
+    def default_message(self) -> str:
+        return f"{self.device} encountered error at XML node {self.node.tag}"+\
+            f"\n with text \'{self.node.text}\'"
         
     @property
     def node(self) -> ET.Element:
@@ -121,11 +133,14 @@ class HardwareError(PXIError):
                 message is simply f"{device} encountered error in {self.task}".             
         """
         self._task = task
-        msg = f"{device} encountered error in {self.task}"
-        if message is not None:
-            msg += message
-                
-        super().__init__(msg, device)
+        self._info = message
+        super().__init__(None, device)
+
+    def default_message(self) -> str:
+        msg = f"{self.device} encountered error in {self.task}"
+        if self._info is not None:
+            msg += self._info
+        return msg
         
     @property
     def task(self):
@@ -1,9 +1,32 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 import colorlog
 from typing import Tuple
 from pxi import PXI
 
 
+# console formatter, built once at import
+sh_formatter = colorlog.ColoredFormatter("%(log_color)s%(levelname)-8s - "
+                                         "%(name)-25s - %(threadName)-15s -"
+                                         " %(asctime)s - %(cyan)s \n  "
+                                         "%(message)s\n",
+                                         datefmt=None,
+                                         reset=True,
+                                         log_colors={
+                                                     'DEBUG':    'cyan',
+                                                     'INFO':     'green',
+                                                     'WARNING':  'yellow',
+                                                     'ERROR':    'red',
+                                                     'CRITICAL': 'red,'
+                                                                 'bg_white',
+                                                     },
+                                         secondary_log_colors={},
+                                         style='%'
+                                         )
+
+
 def setup_logging_handlers():
     """
     This function sets up the error logging to the console. Logging
@@ -17,29 +40,20 @@ def setup_logging_handlers():
 
     # set up logging to console for INFO and worse
     sh = colorlog.StreamHandler()
-    sh.setLevel(logging.INFO)
-
-    sh_formatter = colorlog.ColoredFormatter("%(log_color)s%(levelname)-8s - "
-                                             "%(name)-25s - %(threadName)-15s -"
-                                             " %(asctime)s - %(cyan)s \n  "
-                                             "%(message)s\n",
-                                             datefmt=None,
-                                             reset=True,
-                                             log_colors={
-                                                         'DEBUG':    'cyan',
-                                                         'INFO':     'green',
-                                                         'WARNING':  'yellow',
-                                                         'ERROR':    'red',
-                                                         'CRITICAL': 'red,'
-                                                                     'bg_white',
-                                                         },
-                                             secondary_log_colors={},
-                                             style='%'
-                                             )
     sh.setFormatter(sh_formatter)
 
+    # the server threads only put records on a queue. a listener thread formats
+    # them and writes them to the console. the level is set on the queue
+    # handler, since that is the root handler PXI toggles with the 'd' key
+    log_queue = queue.SimpleQueue()
+    qh = logging.handlers.QueueHandler(log_queue)
+    qh.setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(log_queue, sh)
+    listener.start()
+    atexit.register(listener.stop)
+
     # put the handlers to use
-    root_logger.addHandler(sh)
+    root_logger.addHandler(qh)
 
 
 if __name__ == '__main__':
@@ -49,8 +63,8 @@ if __name__ == '__main__':
 
     #TODO: add config file to write this to and check config file in future
     port = 9000
-    logger.info(f"Default port={port}. \n Hit \'Enter\' for host=localhost "+
-                "(default), any other key then \'Enter\' to use host=\'\'")
+    logger.info("Default port=%d. \n Hit \'Enter\' for host=localhost "
+                "(default), any other key then \'Enter\' to use host=\'\'", port)
     host_choice = input()
     if host_choice == "":
         hostname = "localhost"
@@ -61,7 +75,7 @@ if __name__ == '__main__':
         
     address = (hostname, port)
     
-    logger.info(f'listening on host={hostname} (ip={ip_str}) port={port}')
+    logger.info('listening on host=%s (ip=%s) port=%d', hostname, ip_str, port)
     experiment = PXI(address)
     experiment.launch_keylisten_thread()
     logger.info(PXI.help_str)
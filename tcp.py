@@ -1,4 +1,6 @@
+import os
 import socket
+import selectors
 import struct
 import logging
 import threading
@@ -8,16 +10,38 @@ from datetime import datetime
 
 class TCP:
 
+    # b'MESG' followed by the big-endian length of the body
+    header = struct.Struct("!4sL")
+    # the big-endian length put in front of each field by format_message
+    length_prefix = struct.Struct("!L")
+
     def __init__(self, pxi, address):
-        self.logger = logging.getLogger(str(self.__class__))
+        self.logger = logging.getLogger(self.__class__.__name__)
         self.listening_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if os.name != 'nt':
+            # allow a restarted server to bind while old connections sit in
+            # TIME_WAIT. on Windows this option would let another process take
+            # over the port, and binding is not blocked by TIME_WAIT anyway
+            self.listening_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.listening_socket.bind(address)
         self.listening_socket.listen(100)
         self.current_connection = None
         self.network_thread = None
         self.pxi = pxi
         self.seeking_connection = False
-        self.last_xml = ""
+        self.last_xml = b""
+        # reused for every message body, and grown to fit larger messages
+        self._rx_buffer = bytearray(2**16)
+        self._header_buffer = bytearray(TCP.header.size)
+        # progress through the header, then the body, of the message being read
+        self._rx_got = 0
+        self._rx_length = None
+        self.client_address = None
+        self._selector = selectors.DefaultSelector()
+        # written to by wake() to interrupt the selector from other threads
+        self._wake_send, self._wake_recv = socket.socketpair()
+        self._wake_send.setblocking(False)
+        self._wake_recv.setblocking(False)
 
     @property
     def reset_connection(self) -> bool:
@@ -46,82 +70,151 @@ class TCP:
     def network_loop(self):
         """
         Check for incoming connections and messages on those connections
+
+        A single selector waits on either the listening socket (while seeking a
+        connection) or the current connection, together with the wake socket so
+        that stop_connections and reset_connection are acted on immediately.
         """
 
         self.logger.info("Entering Network Loop")
+        self._selector.register(self._wake_recv, selectors.EVENT_READ, self._on_wake)
+        self._seek_connection()
+        select = self._selector.select
         while not self.stop_connections:
-            self.reset_connection = False
+            for key, _ in select():
+                key.data()
+            if self.reset_connection and self.current_connection is not None:
+                self._close_connection()
+                self._seek_connection()
 
-            # TODO: entering q in cmd line should terminate this process
-            self.logger.info("Attempting to accept connection request.")
-            self.seeking_connection = True
-            self.current_connection, client_address = self.listening_socket.accept()
+        if self.current_connection is not None:
+            self._close_connection()
+        if self.seeking_connection:
+            self._selector.unregister(self.listening_socket)
             self.seeking_connection = False
-            self.logger.info(f"Started connection with {client_address}")
-            while not (self.pxi.reset_connection or self.stop_connections):
-                try:
-                    self.receive_message()
-                except socket.timeout:
-                    pass
-                except ConnectionResetError as e:
-                    self.logger.warning(e)
-                    self.pxi.reset_connection = True
-                    self.logger.info("Connection reset")
-                    
-            self.logger.info(f"Closing connection with {client_address}")
-            self.current_connection.close()
+        self._selector.unregister(self._wake_recv)
         self.logger.info("Closing Networking Thread")
         self.listening_socket.close()
+        # the loop can't be restarted once the listening socket is closed, so
+        # release the selector and the wake sockets with it. a late wake() on
+        # the closed socket is ignored
+        self._selector.close()
+        self._wake_send.close()
+        self._wake_recv.close()
+
+    def wake(self):
+        """
+        Wake the network loop so that it checks stop_connections and
+        reset_connection right away. Safe to call from any thread.
+        """
+        try:
+            self._wake_send.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # already woken, or the loop has exited
+
+    def _on_wake(self):
+        try:
+            self._wake_recv.recv(4096)
+        except (BlockingIOError, OSError):
+            pass
+
+    def _seek_connection(self):
+        self.reset_connection = False
+
+        # TODO: entering q in cmd line should terminate this process
+        self.logger.info("Attempting to accept connection request.")
+        self.seeking_connection = True
+        self._selector.register(self.listening_socket, selectors.EVENT_READ, self._on_accept)
+
+    def _on_accept(self):
+        self.current_connection, self.client_address = self.listening_socket.accept()
+        self._selector.unregister(self.listening_socket)
+        self.seeking_connection = False
+        # replies are small, so send them right away instead of letting
+        # Nagle's algorithm hold them back waiting for more data
+        self.current_connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # notice when CsPy's machine goes away without closing the connection
+        self.current_connection.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # only bounds sendall. reads happen once the selector reports data
+        self.current_connection.settimeout(20)
+        self._rx_got = 0
+        self._rx_length = None
+        self._selector.register(self.current_connection, selectors.EVENT_READ,
+                                self.receive_message)
+        self.logger.info(f"Started connection with {self.client_address}")
+
+    def _close_connection(self):
+        self.logger.info(f"Closing connection with {self.client_address}")
+        self._selector.unregister(self.current_connection)
+        try:
+            # let CsPy see the connection end, even if it is still reading
+            self.current_connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # the connection is already gone
+        finally:
+            self.current_connection.close()
+        self.current_connection = None
 
     def receive_message(self):
         """
-        listens for a message from cspy over the network.
+        reads whatever part of a message from cspy has arrived on the current
+        connection, and queues the message once all of it has been received.
 
         messages from cspy are encoded in the following way:
             message = b'MESG' + str(len(body)) + body
 
         """
-        # Read first 4 bytes looking for a specific message header
-        header = self.current_connection.recv(4)
-        self.logger.debug(f"header was read as {header}")
-        if header == b'MESG':
-            self.logger.info("We got a message! now to handle it.")
-            # Assume next 4 bytes contains the length of the remaining message
-            length_bytes = self.current_connection.recv(4)
-            length = int.from_bytes(length_bytes, byteorder='big')
-            self.logger.debug(f"I think the message is {length} bytes long.")
-            self.current_connection.settimeout(20)
-            bytes_remaining = length
-            message = ''
-
-            while bytes_remaining > 0:
-                snippet = self.current_connection.recv(bytes_remaining)
-                bytes_remaining -=  len(snippet)
-                message += TCP.bytes_to_str(snippet)
-            if message != "<LabView><measure/></LabView>":
-                self.last_xml = message
-            
-            if len(message) == length:
-                self.logger.debug("message received with expected length.")
-                self.pxi.queue_command(message)
-            else:
-                self.logger.warning(f"Something went wrong,"
-                                 f" I only found {len(message)} bytes to read!")
+        # the 'MESG' header and the body length are read together, then the body
+        if self._rx_length is None:
+            buffer, wanted = self._header_buffer, TCP.header.size
         else:
-            self.logger.info("We appear to have received junk. Clearing buffer.")
-            self.current_connection.settimeout(0.01)
-            try:
-                while not (self.reset_connection or self.stop_connections):
-                    junk = self.current_connection.recv(4096)
-                    if junk == b"":
-                        break
-            except socket.timeout:
-                pass
-            finally:
+            buffer, wanted = self._rx_buffer, self._rx_length
+
+        try:
+            with memoryview(buffer) as view:
+                n = self.current_connection.recv_into(view[self._rx_got:wanted])
+        except socket.timeout:
+            return
+        except ConnectionResetError as e:
+            self.logger.warning(e)
+            self.reset_connection = True
+            self.logger.info("Connection reset")
+            return
+        if n == 0:
+            self.logger.warning("Connection closed by CsPy")
+            self.reset_connection = True
+            self.logger.info("Connection reset")
+            return
+        self._rx_got += n
+        if self._rx_got < wanted:
+            return
+        self._rx_got = 0
+
+        if self._rx_length is None:
+            header, length = TCP.header.unpack(self._header_buffer)
+            self.logger.debug("header was read as %s", header)
+            if header != b'MESG':
+                # the framing is lost, so drop the connection and let CsPy reconnect
+                self.logger.warning("Bad message header %r. Resetting the connection.", header)
                 self.reset_connection = True
-                self.logger.info("reset connection true")
-                
-                
+                return
+            self.logger.debug("We got a message! It should be %d bytes long.", length)
+            if length > len(self._rx_buffer):
+                # at least double, so slowly growing messages do not reallocate every time
+                self._rx_buffer = bytearray(max(2*len(self._rx_buffer), length))
+            self._rx_length = length
+            if length > 0:
+                return  # wait for the body
+
+        message = bytes(memoryview(self._rx_buffer)[:self._rx_length])
+        self._rx_length = None
+
+        if message != b"<LabView><measure/></LabView>":
+            self.last_xml = message
+
+        self.logger.debug("message received with expected length.")
+        self.pxi.queue_command(message)
+
     def send_message(self, msg_str=None):
         """
         Send a message back to CsPy via the current connection.
@@ -132,10 +225,16 @@ class TCP:
         
         if not self.stop_connections: # and msg_str:
             try:
-                self.logger.debug("encoding message")
-                encoded = b"MESG"+TCP.format_message(msg_str)
-                self.current_connection.send(encoded)
-                self.logger.info("message sent")
+                if msg_str is None:
+                    # e.g. a measurement that errored. CsPy still waits for a
+                    # reply, so send it an empty one
+                    self.logger.warning("No reply body to send to CsPy. Sending an empty message.")
+                    msg_str = b""
+                elif isinstance(msg_str, str):
+                    msg_str = msg_str.encode()
+                encoded = TCP.header.pack(b"MESG", len(msg_str)) + msg_str
+                self.current_connection.sendall(encoded)
+                self.logger.debug("message sent")
             except Exception:
                 self.logger.exception("Issue sending message back to CsPy.")
                 self.reset_connection = True
@@ -148,15 +247,17 @@ class TCP:
         print last xml to a file
         """
         fname = "xml_" + (datetime.now()).strftime("%Y%m%d_%H_%M_%S") + ".txt"
-        with open(fname, 'w') as f:
+        with open(fname, 'wb') as f:
             f.write(self.last_xml)
         return fname
             
             
     def abort(self):
-        kill_socket = socket.socket()
-        kill_socket.connect(('127.0.0.1', 9000))
-        kill_socket.close()
+        """
+        Stop waiting for a connection from CsPy. The network loop exits once
+        stop_connections is set.
+        """
+        self.wake()
 
     
     @staticmethod
@@ -172,7 +273,7 @@ class TCP:
         """
         if isinstance(message, str):
             message = message.encode()
-        return struct.pack('!L', len(message)) + message
+        return TCP.length_prefix.pack(len(message)) + message
 
 
     @staticmethod
@@ -190,4 +291,5 @@ class TCP:
 
     @staticmethod
     def bytes_to_str(data) -> str:
-        return ''.join(map(chr, data))
\ No newline at end of file
+        # latin-1 maps each byte to the code point of the same value
+        return bytes(data).decode('latin-1')
\ No newline at end of file
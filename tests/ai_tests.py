@@ -1,19 +1,15 @@
 """
 Tests for AnalogInput class methods
 """
+import re
 import xml.etree.ElementTree as ET
 from analogin import AnalogInput
 
 def msg_from_file(file="to_pxi.txt"): # 
-	msgs = []
 	with open(file) as f:
-		lines = f.readlines()
-		for line in lines:
-			if "NEW MESSAGE" in line:
-				msgs.append('')
-				continue
-			msgs[-1] += line
-	return msgs
+		text = f.read()
+	# each line containing "NEW MESSAGE" starts a new message
+	return re.split(r"^.*NEW MESSAGE.*\n?", text, flags=re.M)[1:]
 
 if __name__ == "__main__":
 	msg = msg_from_file()[0]
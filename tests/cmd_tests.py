@@ -37,15 +37,10 @@ allowed_devs = ['hsdio',
                        'rf_generators']
 
 def msg_from_file(file="to_pxi.txt"): # 
-	msgs = []
 	with open(file) as f:
-		lines = f.readlines()
-		for line in lines:
-			if "NEW MESSAGE" in line:
-				msgs.append('')
-				continue
-			msgs[-1] += line
-	return msgs
+		text = f.read()
+	# each line containing "NEW MESSAGE" starts a new message
+	return re.split(r"^.*NEW MESSAGE.*\n?", text, flags=re.M)[1:]
     
     
 def call_method(funcname, instance, args=None):
@@ -55,8 +50,8 @@ def call_method(funcname, instance, args=None):
         'funcname': name of function supposedly belonging to instance 
         'instance': instance of a class being tested
     """
-    if funcname in dir(instance):
-        func = getattr(instance, funcname)
+    func = getattr(instance, funcname, None)
+    if callable(func):
         if args is None:
             func()
         else:
@@ -76,9 +71,14 @@ def testdevice(device, method):
         f"\n Recognized device names are \n {allowed_devs} \n"+
         "You may have to add your device to \'allowed_devs\' in this tool")
         
+    # class to instantiate for each device tag. DAQmxDO, camera, AnalogOutput,
+    # AnalogInput, Counters and RF_generators are not implemented in this tool yet
+    dev_classes = {'hsdio': HSDIO, 'ttl': TTLInput}
+
     args = None
         
     for child in root:
+        tag = child.tag.lower()
     
         if method == 'init':
             args = child
@@ -86,53 +86,9 @@ def testdevice(device, method):
         if method == 'all':
             pass # option to test all methods somehow by looping through
             
-        elif child.tag == "HSDIO" :
-            hsdio = HSDIO(pxi)
-            call_method(method, hsdio, args)
-            
-        elif child.tag == "TTL"  and child.tag.lower() == device:
-            ttl = DigitalIn(pxi)
-            call_method(method, ttl, args)
-            
-            
-        elif child.tag == "DAQmxDO" and child.tag.lower() == device:
-            # TODO: implement DAQmxDO class
-            # self.daqmxdo.load_xml(child)
-            # self.daqmxdo.init() # called setup in labview
-            pass
-
-        elif child.tag == "camera" and child.tag.lower() == device:
-            pass
-            # set up the Hamamatsu camera
-            # self.hamamatsu.load_xml(child)
-            # self.hamamatsu.init()
-
-        elif child.tag == "AnalogOutput" and child.tag.lower() == device:
-            # TODO: implement analog_output class
-            # set up the analog_output
-            # self.analog_output.load_xml(child)
-            # self.analog_output.init() # setup in labview
-            # self.analog_output.update()
-            pass
-
-        elif child.tag == "AnalogInput" and child.tag.lower() == device:
-            # TODO: implement analog_input class
-            # set up the analog_input
-            # self.analog_input.load_xml(child)
-            # self.analog_input.init()
-            pass
-
-        elif child.tag == "Counters" and child.tag.lower() == device:
-            # TODO: implement counters class
-            # set up the counters
-            # self.counters.load_xml(child)
-            # self.counters.init()
-            pass
-
-        # might implement, or might move RF generator functionality to
-        # CsPy based on code used by Hybrid.
-        elif child.tag == "RF_generators" and child.tag.lower() == device:
-            pass
+        elif tag in allowed_devs:
+            if tag == device and tag in dev_classes:
+                call_method(method, dev_classes[tag](pxi), args)
         
             ## non-device things that could be tested
             
@@ -23,15 +23,10 @@ from waveform import *
 
 
 def msg_from_file(file="to_pxi.txt"): #
-    msgs = []
     with open(file) as f:
-        lines = f.readlines()
-        for line in lines:
-            if "NEW MESSAGE" in line:
-                msgs.append('')
-                continue
-            msgs[-1] += line
-    return msgs
+        text = f.read()
+    # each line containing "NEW MESSAGE" starts a new message
+    return re.split(r"^.*NEW MESSAGE.*\n?", text, flags=re.M)[1:]
     
 
 def hsdio_tests(pxi, node):
@@ -179,25 +174,13 @@ if __name__ == "__main__":
         
     #### run tests for each device
     # loop over xml tags and call desired tests
+    tests = {
+        "HSDIO": hsdio_tests,
+        "DAQmxDO": daqmxdo_tests,
+        "AnalogInput": ai_tests, # TODO implement
+        "AnalogOutput": ao_tests}
+    # Counters, TTL and RF_generators have no tests yet
     for child in root:
-        if child.tag == "HSDIO" and not skiplist[child.tag]:
-            hsdio_tests(pxi, child)
-            
-        elif child.tag == "Counters" and not skiplist[child.tag]:
-            pass
-            
-        elif child.tag == "TTL" and not skiplist[child.tag]:
-            pass
-            
-        elif child.tag == "DAQmxDO" and not skiplist[child.tag]:
-            daqmxdo_tests(pxi, child)
-            
-        elif child.tag == "AnalogInput" and not skiplist[child.tag]:
-            ai_tests(pxi, child) # TODO implement
-            
-        elif child.tag == "AnalogOutput" and not skiplist[child.tag]:
-            ao_tests(pxi, child)
-            
-        elif child.tag == "RF_generators" and not skiplist[child.tag]:
-            pass
-            
\ No newline at end of file
+        test = tests.get(child.tag)
+        if test is not None and not skiplist[child.tag]:
+            test(pxi, child)
@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+import xml.etree.ElementTree as ET
+from pxierrors import XMLError
+from waveform import HSDIOWaveform, parse_uints
+
+
+def test_decompress_wdt():
+    transitions = np.array([0, 2, 3], dtype=np.uint32)
+    states = np.zeros((3, 32), dtype=np.uint32)
+    states[0, 0] = 1
+    states[1, 1] = 1
+    states[2, 31] = 1
+    wave = HSDIOWaveform("test", transitions, states)
+
+    expected = states[[0, 0, 1, 2]].astype(np.uint8)
+    fmt, wvfm = wave.decompress("WDT", data_layout=True)
+    assert fmt == "WDT"
+    assert np.array_equal(wvfm, expected.ravel())
+    fmt, wvfm = wave.decompress("WDT", data_layout=False)
+    assert np.array_equal(wvfm, expected.T.ravel())
+
+
+def test_init_from_xml():
+    node = ET.fromstring(
+        "<waveform><name>w</name><transitions>0 2 3</transitions>"
+        "<states>" + "\n".join(" ".join(["1"] * 32) for _ in range(3)) + "</states></waveform>"
+    )
+    wave = HSDIOWaveform(node=node)
+    assert wave.name == "w"
+    assert np.array_equal(wave.transitions, [0, 2, 3])
+    assert wave.states.shape == (3, 32)
+
+    node.find("transitions").text = "0 x 3"
+    with pytest.raises(XMLError):
+        HSDIOWaveform(node=node)
+
+
+def test_init_from_xml_ragged_states():
+    # 96 values would reshape into 3 rows of 32, but the lines hold 32, 31 and 33
+    lines = [" ".join(["1"] * n) for n in (32, 31, 33)]
+    node = ET.fromstring(
+        "<waveform><name>w</name><transitions>0 2 3</transitions>"
+        "<states>" + "\n".join(lines) + "</states></waveform>"
+    )
+    with pytest.raises(XMLError):
+        HSDIOWaveform(node=node)
+
+
+def test_parse_uints():
+    assert np.array_equal(parse_uints(" 7  8\t9\n"), [7, 8, 9])
+    assert np.array_equal(parse_uints("0 1 2\r\n3 4 5\n", rows=True), [[0, 1, 2], [3, 4, 5]])
+    for bad in ["", "5x", "1,2", "2.5", "-3", "4294967296"]:
+        with pytest.raises(ValueError):
+            parse_uints(bad)
+    with pytest.raises(ValueError, match="different lengths"):
+        parse_uints("1 0 1\n1 0\n1 1 0 1", rows=True)
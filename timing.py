@@ -2,21 +2,26 @@
 Timed loop with Python built-in module 'time'
 """
 
-from time import perf_counter_ns, perf_counter
-from numpy import empty, std, mean
+from time import perf_counter_ns, perf_counter, sleep
+from numpy import empty, std, mean, int64
 
 runs = 1000 # iterations
 freq = 1000 # [Hz]
 tau = 1000/(freq) # [ms]
+# sleep for most of each period, and busy-wait only for the last 'spin' ms,
+# since sleep() can overshoot. with Python < 3.11 on Windows sleep() has ~15 ms
+# granularity, so set spin >= tau there to busy-wait for the whole period
+spin = 0.2 # [ms]
 
 # 1kHz loop
 
-dtimes = empty(runs, int)
+dtimes = empty(runs, int64) # [ns]
 
 t0 = perf_counter_ns()
 # t0 = perf_counter()
 
 scl = 1e-6 # to convert ns to ms
+tau_ns = tau/scl # [ns]
 # scl = 1e3 # to convert second to ms
 
 # t_init = perf_counter_ns()
@@ -27,10 +32,14 @@ for i in range(runs):
     # do some stuff which takes dt < 1/freq
     
     # using perf_counter_ns:
+    remaining = tau - (perf_counter_ns() - t0)*scl # [ms]
+    if remaining > spin:
+        sleep((remaining - spin)/1000)
     while True:
-        dtimes[i] = perf_counter_ns() - t0
-        if dtimes[i]*scl > tau: # compare time in ms
-            #print('t_iter:',dtimes[i])
+        dt = perf_counter_ns() - t0
+        if dt > tau_ns: # compare time in ns
+            dtimes[i] = dt # only stored once the period is over
+            #print('t_iter:',dt)
             t0 = perf_counter_ns()
             break
             
@@ -43,16 +52,17 @@ for i in range(runs):
                 # break
 
 # t_elapsed = (perf_counter_ns() - t_init)*scl # [ms]
-t_elapsed = (perf_counter() - t_init)*scl
+t_elapsed = (perf_counter() - t_init)*1e3 # perf_counter is in seconds
 
 dt_avg = mean(dtimes)
 dt_std = std(dtimes)
+dt_sum = dtimes.sum()
 
 print(f'runs={runs} \n'+ # loop iterations
         f'f={freq/1000}kHz \n'+ # loop frequency
         f'dt_avg={dt_avg*scl}[ms] \n'+ # measured loop period std
         f'dt_std={dt_std*scl}[ms] \n'+ # measured loop period std
         f'loop duration={t_elapsed}[ms] \n'+ # actual time elapsed, by measuring loop duration directly
-        f'sum(dt) = {sum(dtimes)*scl}[ms] \n'+ # total time elapsed, according to counted time
-        f'ghost time = {t_elapsed-sum(dtimes)*scl}[ms]') # time unaccounted for in loop timing
+        f'sum(dt) = {dt_sum*scl}[ms] \n'+ # total time elapsed, according to counted time
+        f'ghost time = {t_elapsed-dt_sum*scl}[ms]') # time unaccounted for in loop timing
     
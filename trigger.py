@@ -3,7 +3,6 @@ Trigger class for the PXI Server
 SaffmanLab, University of Wisconsin - Madison
 """
 
-from ctypes import c_uint32
 import xml.etree.ElementTree as ET
 from nidaqmx.constants import Edge
 from instruments.instrument import XMLLoader, Instrument
@@ -12,6 +11,8 @@ from pxierrors import XMLError
 
 class Trigger(XMLLoader):
     """ Trigger data type for PXI server """
+    __slots__ = ("source", "trig_ID", "trig_type", "edge", "level")
+
     EDGES = {"rising edge": 12,
              "falling edge": 13,
              "default": "rising edge"}
@@ -23,13 +24,17 @@ class Trigger(XMLLoader):
     LEVELS = {"high level": 34,
               "low level": 35,
               "default": "high level"}
+
+    _DEFAULT_TYPE = TYPES[TYPES["default"]]
+    _DEFAULT_EDGE = EDGES[EDGES["default"]]
+    _DEFAULT_LEVEL = LEVELS[LEVELS["default"]]
     
     def __init__(self, node: ET.Element = None):
         self.source = ""
         self.trig_ID = ""
-        self.trig_type = self.TYPES[self.TYPES["default"]]
-        self.edge = self.EDGES[self.EDGES["default"]]
-        self.level = self.LEVELS[self.LEVELS["default"]]
+        self.trig_type = self._DEFAULT_TYPE
+        self.edge = self._DEFAULT_EDGE
+        self.level = self._DEFAULT_LEVEL
 
         super().__init__(node)
 
@@ -94,6 +99,8 @@ class StartTrigger(XMLLoader):
         edge: an allowed trigger edge, as defined by internal dictionaries (see
             above).
     """
+    __slots__ = ("source", "wait_for_start_trigger", "description", "edge")
+
     EDGES = {"rising edge": 12,
              "falling edge": 13,
              "default": "rising edge"}
@@ -102,11 +109,13 @@ class StartTrigger(XMLLoader):
                      "falling": Edge.FALLING,
                      "default": "rising"}
 
+    _DEFAULT_EDGE = EDGES[EDGES["default"]]
+
     def __init__(self, node: ET.Element = None):
         self.source = ""
         self.wait_for_start_trigger = False
         self.description = ""
-        self.edge = self.EDGES[self.EDGES["default"]]
+        self.edge = self._DEFAULT_EDGE
 
         super().__init__(node)
 
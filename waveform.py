@@ -14,6 +14,58 @@ import xml.etree.ElementTree as ET
 from typing import List, Tuple
 from pxierrors import XMLError
 
+
+_UINT32_MAX = np.iinfo(np.uint32).max
+
+
+def parse_uints(text: str, rows: bool = False) -> np.ndarray:
+    """
+    Parse whitespace separated unsigned integers, as sent by CsPy, into a uint32 array.
+
+    Args:
+        text : the text of an xml node
+        rows : if True, each non-blank line of text is a row of the returned 2D array, and every
+            row must hold the same number of values
+
+    Raises:
+        ValueError if text holds no values, anything other than whitespace separated integers
+        that fit in a uint32, or if rows is True and the lines hold different numbers of values
+    """
+    # check the characters as an array of bytes, so no python object is made per value
+    chars = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    newline = chars == ord("\n")
+    space = (chars == ord(" ")) | newline | (chars == ord("\t")) | (chars == ord("\r"))
+    digit = (chars - np.uint8(ord("0"))) < 10
+    if not (space | digit).all():
+        raise ValueError("expected only whitespace separated unsigned integers")
+
+    # a value starts at each digit that follows whitespace or the start of the text
+    starts = digit
+    starts[1:] &= space[:-1]
+    starts = np.flatnonzero(starts)
+    if not starts.size:
+        raise ValueError("expected unsigned integers, got no values")
+
+    # np.fromstring stops quietly at anything it can't parse and wraps values that overflow
+    # its dtype, so check the count here, and parse into uint64, which saturates instead
+    values = np.fromstring(text, dtype=np.uint64, sep=" ")
+    if values.size != starts.size:
+        raise ValueError("could not parse every value")
+    if values.max() > _UINT32_MAX:
+        raise ValueError("value out of range for uint32")
+    values = values.astype(np.uint32)
+
+    if rows:
+        # number of values before each line break, and so on each line
+        before = np.searchsorted(starts, np.flatnonzero(newline))
+        per_line = np.diff(before, prepend=0, append=starts.size)
+        per_line = per_line[per_line > 0]
+        if (per_line != per_line[0]).any():
+            raise ValueError(f"rows of different lengths {per_line.tolist()}")
+        values = values.reshape(per_line.size, -1)
+    return values
+
+
 class Waveform(ABC): # should this be an XMLLoader?
     """
     The base class for Waveform data types for the PXI Server. 
@@ -21,6 +73,7 @@ class Waveform(ABC): # should this be an XMLLoader?
     Methods that have the 'abstractmethod' decorator are abstract and must be 
     implemented explicitly in the child class. 
     """
+    __slots__ = ("name", "transitions", "_length", "states", "data_format", "wvfm")
 
     def __init__(self, name="", transitions=None, states=None, data_format=None):
         self.name = name
@@ -73,9 +126,9 @@ class Waveform(ABC): # should this be an XMLLoader?
         If the waveform is uncompressed, this is equal to number of samples that
         will be written per channel
         """
-        assert self.transitions is not None, """Tried to read number of waveform
-                                                         transitions, but transitions have not 
-                                                         been supplied yet!"""
+        if self.transitions is None:
+            raise ValueError("Tried to read number of waveform transitions, but transitions have "
+                             "not been supplied yet!")
         return self._length
         
     @length.setter
@@ -91,6 +144,7 @@ class DAQmxDOWaveform(Waveform):
     """
     Waveform class for use in the DAQmxDO class
     """
+    __slots__ = ("logger",)
     
     def __init__(self, name="", transitions=None, states=None, data_format=None):
         super().__init__(name, transitions, states, data_format)
@@ -112,15 +166,12 @@ class DAQmxDOWaveform(Waveform):
                     self.name = child.text
 
                 elif child.tag == "transitions":
-                    t = np.array([x for x in child.text.split(" ")], 
-                                 dtype=c_uint32)
+                    t = parse_uints(child.text)
                     self.transitions = t
                     self.length = len(self.transitions)
 
                 elif child.tag == "states":
-                    states = np.array([[int(x) for x in line.split(" ")]
-                                      for line in child.text.split("\n")],
-                                      dtype=c_uint32)
+                    states = parse_uints(child.text, rows=True)
                     self.states = states
 
                 else:
@@ -134,6 +185,7 @@ class HSDIOWaveform(Waveform):
     """
     Waveform class for use in the HSDIO class
     """
+    __slots__ = ("logger",)
     
     def __init__(
             self,
@@ -171,17 +223,14 @@ class HSDIOWaveform(Waveform):
 
                 elif child.tag == "transitions":
                     # self.logger.debug(f"writing transitions {child.text}")
-                    t = np.array([x for x in child.text.split(" ")], 
-                                 dtype=c_uint32)
+                    t = parse_uints(child.text)
                     self.transitions = t
                     # self.logger.debug(f"transitions written {self.transitions}")
                     self.length = len(self.transitions)
 
                 elif child.tag == "states":
                     # self.logger.debug(f"writing states {child.text}")
-                    states = np.array([[int(x) for x in line.split(" ")]
-                                      for line in child.text.split("\n")],
-                                      dtype=c_uint32)
+                    states = parse_uints(child.text, rows=True)
                     self.states = states
                     # self.logger.debug(f"states writen {self.states}")
                     self.check_state_len()
@@ -216,7 +265,7 @@ class HSDIOWaveform(Waveform):
                     When this format is used, use HsdioSession.write_waveform_wdt() to write the
                     waveform to the HSDIO
                 * "uInt32" - the 2D array is compressed to correspond to niHSDIO's U32 waveforms.
-                    Each index in output array is a c_uint32(), which encodes the output state of
+                    Each index in output array is a uint32, which encodes the output state of
                     all HSDIO output channels (0-32). When this option is selected the data_layout
                     parameter does nothing, and is assumed to be True
                     When this format is used, use HsdioSession.write_wavefor_uint32() to write the
@@ -235,7 +284,7 @@ class HSDIOWaveform(Waveform):
 
         Returns:
             self.format (str): data encoding format
-            self.wvfm (np.array(c_uint8 or c_uint32)): uncompressed waveform data array
+            self.wvfm (np.array(np.uint8 or np.uint32)): uncompressed waveform data array
         """
 
         allowed_formats = ["WDT", "uInt32"]
@@ -243,32 +292,29 @@ class HSDIOWaveform(Waveform):
 
         if data_format == "WDT":
 
-            t_old = self.transitions[0]
-            s_old = self.states[0]
-            wvfm = np.zeros(
-                (len(self), len(self.states[0])),
-                dtype=c_uint8
-            )
-
-            for state, transition in zip(self.states, self.transitions):
-                for c in range(transition, len(wvfm)):
-                    wvfm[c, :] = state
+            states = np.asarray(self.states, dtype=np.uint8)
+            start = int(self.transitions[0])
+            nchan = states.shape[1]
 
+            # build the array in the requested layout, so ravel() doesn't have to copy
             if data_layout:
-                wvfm = wvfm.flatten()
+                axis, head_shape = 0, (start, nchan)
             else:
-                wvfm = wvfm.transpose().flatten()
+                states = states.T
+                axis, head_shape = 1, (nchan, start)
+
+            wvfm = np.repeat(states, self._hold_counts(), axis=axis)
+            if start:
+                # nothing is output before the first transition
+                wvfm = np.concatenate((np.zeros(head_shape, dtype=np.uint8), wvfm), axis=axis)
+
+            wvfm = wvfm.ravel()
 
         elif data_format == "uInt32":
-            t_old = self.transitions[0]
-            s_old = self.state_to_int32(self.states[0])
-            wvfm = np.zeros(len(self), dtype=c_uint32)
-            for state, transition in zip(self.states, self.transitions):
-                c_state = self.state_to_int32(state)
-                for c in range(t_old, transition):
-                    wvfm[c] = s_old
-                t_old = transition
-                s_old = c_state
+            start = int(self.transitions[0])
+            wvfm = np.repeat(self.states_to_uint32(self.states), self._hold_counts())
+            if start:
+                wvfm = np.concatenate((np.zeros(start, dtype=np.uint32), wvfm))
         else:
             self.logger.error("You shouldn't be here, you used the wrong input for data_format")
             return data_format, None
@@ -278,6 +324,17 @@ class HSDIOWaveform(Waveform):
 
         return self.data_format, self.wvfm
 
+    def _hold_counts(self) -> np.ndarray:
+        """
+        Number of samples each state in self.states is held for. Assumes self.transitions is
+        ascending; the last state is held until the end of the waveform.
+        """
+        t = np.asarray(self.transitions, dtype=np.int64)
+        counts = np.empty_like(t)
+        counts[:-1] = t[1:] - t[:-1]
+        counts[-1] = len(self) - t[-1]
+        return counts
+
     def state_to_int32(self, state: [int]):
         """
         Converts state into a c_unit32() bit by bit.
@@ -289,10 +346,23 @@ class HSDIOWaveform(Waveform):
         Returns:
             c_state : c_unit32 encoding of state
         """
-        state_int = 0
-        for ele in state:
-            state_int = (state_int << 1) | ele
-        return c_uint32(state_int)
+        return c_uint32(int(self.states_to_uint32(np.asarray(state)[np.newaxis])[0]))
+
+    @staticmethod
+    def states_to_uint32(states: np.ndarray) -> np.ndarray:
+        """
+        Converts each row of states into a uint32, the first element of a row being the most
+        significant bit.
+
+        Args:
+            states : 2D array of 0s and 1s, at most 32 columns wide
+
+        Returns:
+            1D uint32 array with one entry per row of states
+        """
+        states = np.asarray(states, dtype=np.uint32)
+        weights = np.left_shift(np.uint32(1), np.arange(states.shape[1] - 1, -1, -1, dtype=np.uint32))
+        return (states * weights).sum(axis=1, dtype=np.uint32)
 
     def wave_split(self, flip: bool = True) -> List[HSDIOWaveform]:
         """
@@ -312,25 +382,25 @@ class HSDIOWaveform(Waveform):
             list of split up waveform objects
         """
 
-        dev = int(len(self.states[0])/32)
+        dev = self.states.shape[1] // 32
+
+        # regroup the states as (device, state, channel) in one copy, so each device's states
+        # are a contiguous block of it
+        blocks = self.states.reshape(-1, dev, 32).transpose(1, 0, 2)
+        if flip:
+            blocks = blocks[:, :, ::-1]
+        blocks = np.ascontiguousarray(blocks)
 
         # mapping may be confused in practical order of devices, maybe flip comes before split?
-        wave_array = []
-        for d in range(dev):
-            if flip:
-                new_states = np.array([np.flip(state[d*32:(d+1)*32]) for state in self.states])
-            else:
-                new_states = np.array([state[d*32:(d+1)*32] for state in self.states])
-            wave_array.append(
-                HSDIOWaveform(
-                    self.name,
-                    self.transitions,
-                    new_states,
-                    self.data_format
-                )
+        return [
+            HSDIOWaveform(
+                self.name,
+                self.transitions,
+                new_states,
+                self.data_format
             )
-
-        return wave_array
+            for new_states in blocks
+        ]
 
     def check_state_len(self):
         """
@@ -346,11 +416,12 @@ class HSDIOWaveform(Waveform):
         assert state_len % 32 == 0, as_ms
 
     def __repr__(self):
-        ms = f"Waveform {self.name}\n samples_per_chan {max(self.transitions)}"
+        ms = f"Waveform {self.name}\n samples_per_chan {np.max(self.transitions)}"
         # comment out when not debugging
         ms += f"\n Full Waveform: transitions : {self.transitions}\n states : {self.states}"
         return ms
 
     def __len__(self):
-        # the [1] makes the 1 transition case (self.transitions = [0]) work nicely
-        return max(self.transitions+[1])
+        # the last state is output for one sample, which also makes the 1 transition case
+        # (self.transitions = [0]) work nicely
+        return int(np.max(self.transitions)) + 1